@@ -10,27 +10,47 @@
 # Copied and adapted from
 # https://raw.githubusercontent.com/matrix-org/pushbaby/master/pushbaby/truncate.py
 import json
-import sys
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Dict, List, Optional, Union
 
-if TYPE_CHECKING or sys.version_info < (3, 8, 0):
-    from typing_extensions import Literal
-else:
-    from typing import Literal
+import attr
 
-Choppable = Union[
-    Tuple[Literal["alert", "alert.body"]], Tuple[Literal["alert.loc-args"], int]
-]
+# `json.dumps` builds a fresh encoder on every call when given any non-default
+# arguments, so keep a single one around instead.
+# Note that this must produce the same output as the JSON encoding used by
+# aioapns when sending the payload, otherwise our length calculations are off.
+# Payloads are freshly built trees of JSON-able values, so they can't contain
+# reference cycles and we can skip checking for them.
+_json_encoder = json.JSONEncoder(ensure_ascii=False, check_circular=False)
 
 
 def json_encode(payload: Dict[str, Any]) -> bytes:
-    return json.dumps(payload, ensure_ascii=False).encode()
+    return _json_encoder.encode(payload).encode()
 
 
 class BodyTooLongException(Exception):
     pass
 
 
+@attr.s(slots=True, auto_attribs=True, eq=False)
+class Choppable:
+    """
+    A string field of an APNs payload which is safe to truncate.
+
+    Rather than describing where the field lives in the payload, this refers
+    directly to the dict or list holding it, so that it can be read and
+    replaced with a single indexing operation.
+    """
+
+    # A dict (in which case `key` is a str) or a list (in which case `key` is
+    # an int).
+    container: Any
+    key: Union[str, int]
+    # The length of the field, in bytes, when UTF-8 encoded. This is kept up
+    # to date as the field is chopped, rather than re-encoding it every time we
+    # need to find the longest choppable.
+    length: int = 0
+
+
 def is_too_long(payload: Dict[Any, Any], max_length: int = 2048) -> bool:
     """
     Returns True if the given payload dictionary is too long for a push.
@@ -56,36 +76,83 @@ def truncate(payload: Dict[str, Any], max_length: int = 2048) -> Dict[str, Any]:
 
     Returns:
         Nested dict which should comply with the maximum length restriction.
+        If the payload already fits, it is returned as-is.
 
     """
-    payload = payload.copy()
     if "aps" not in payload:
         if is_too_long(payload, max_length):
             raise BodyTooLongException()
         else:
             return payload
+
+    # Encode the payload once and then keep track of how its length changes as
+    # we chop characters off, rather than re-encoding it after every chop.
+    current_length: Optional[int]
+    try:
+        current_length = len(json_encode(payload))
+    except TypeError:
+        # bytes choppables can't be encoded until they have been decoded below
+        current_length = None
+
+    # the vast majority of payloads fit already, so there's nothing to do
+    if current_length is not None and current_length <= max_length:
+        return payload
+
+    payload = payload.copy()
     aps = payload["aps"]
 
-    # first ensure all our choppables are str objects.
-    # We need them to be for truncating to work and this
-    # makes more sense than checking every time.
-    for c in _choppables_for_aps(aps):
-        val = _choppable_get(aps, c)
-        if isinstance(val, bytes):
-            _choppable_put(aps, c, val.decode())
+    choppables = _choppables_for_aps(aps)
+    for c in choppables:
+        val = c.container[c.key]
+        # first ensure all our choppables are str objects.
+        # We need them to be for truncating to work and this
+        # makes more sense than checking every time.
+        # (An exact type check is cheaper and we don't expect subclasses.)
+        if type(val) is bytes:  # noqa: E721
+            val = c.container[c.key] = val.decode()
+        c.length = _utf8_len(val)
+
+    if current_length is None:
+        current_length = len(json_encode(payload))
 
     # chop off whole unicode characters until it fits (or we run out of chars)
-    while is_too_long(payload, max_length):
-        longest = _longest_choppable(aps)
+    while current_length > max_length:
+        longest = _longest_choppable(choppables)
         if longest is None:
             raise BodyTooLongException()
 
-        txt = _choppable_get(aps, longest)
+        txt = longest.container[longest.key]
+        length = longest.length
+        min_length = _min_length_to_stay_longest(choppables, longest)
+
+        def done_chopping(keep: int) -> bool:
+            # We are done chopping `longest` once the payload fits, or once it
+            # would stop being the longest choppable (at which point we need to
+            # pick another one to chop instead).
+            # Only the characters being chopped off are measured, so that the
+            # work done is proportional to how much we chop, not to the total
+            # length of the text.
+            chopped = txt[keep:]
+            if length - _utf8_len(chopped) < min_length:
+                return True
+            return current_length - _json_len(chopped) <= max_length
+
+        # Rather than chopping a character at a time, binary search for the
+        # number of characters to keep.
         # Note that python's support for this is actually broken on some OSes
         # (see test_apnstruncate.py)
-        txt = txt[:-1]
-        _choppable_put(aps, longest, txt)
-        payload["aps"] = aps
+        low, high = 0, len(txt) - 1
+        while low < high:
+            mid = (low + high + 1) // 2
+            if done_chopping(mid):
+                low = mid
+            else:
+                high = mid - 1
+
+        chopped = txt[low:]
+        current_length -= _json_len(chopped)
+        longest.container[longest.key] = txt[:low]
+        longest.length = length - _utf8_len(chopped)
 
     return payload
 
@@ -97,48 +164,61 @@ def _choppables_for_aps(aps: Dict[str, Any]) -> List[Choppable]:
 
     alert = aps["alert"]
     if isinstance(alert, str):
-        ret.append(("alert",))
+        ret.append(Choppable(aps, "alert"))
     elif isinstance(alert, dict):
         if "body" in alert:
-            ret.append(("alert.body",))
+            ret.append(Choppable(alert, "body"))
         if "loc-args" in alert:
-            ret.extend([("alert.loc-args", i) for i in range(len(alert["loc-args"]))])
+            loc_args = alert["loc-args"]
+            ret.extend(Choppable(loc_args, i) for i in range(len(loc_args)))
 
     return ret
 
 
-def _choppable_get(
-    aps: Dict[str, Any],
-    choppable: Choppable,
-) -> str:
-    if choppable[0] == "alert":
-        return aps["alert"]
-    elif choppable[0] == "alert.body":
-        return aps["alert"]["body"]
-    elif choppable[0] == "alert.loc-args":
-        return aps["alert"]["loc-args"][choppable[1]]
-
-
-def _choppable_put(
-    aps: Dict[str, Any],
-    choppable: Choppable,
-    val: str,
-) -> None:
-    if choppable[0] == "alert":
-        aps["alert"] = val
-    elif choppable[0] == "alert.body":
-        aps["alert"]["body"] = val
-    elif choppable[0] == "alert.loc-args":
-        aps["alert"]["loc-args"][choppable[1]] = val
-
-
-def _longest_choppable(aps: Dict[str, Any]) -> Optional[Choppable]:
+def _utf8_len(val: str) -> int:
+    """
+    Returns the length, in bytes, of the given string when UTF-8 encoded.
+    """
+    if val.isascii():
+        return len(val)
+    return len(val.encode())
+
+
+def _json_len(val: str) -> int:
+    """
+    Returns the length, in bytes, that the given string occupies in the
+    JSON-encoded payload, excluding the surrounding quotes.
+    """
+    # Most text is printable ASCII, which needs no escaping, so there's no
+    # need to invoke the JSON encoder at all.
+    if val.isascii() and val.isprintable() and '"' not in val and "\\" not in val:
+        return len(val)
+    return _utf8_len(_json_encoder.encode(val)) - 2
+
+
+def _longest_choppable(choppables: List[Choppable]) -> Optional[Choppable]:
     longest = None
     length_of_longest = 0
-    for c in _choppables_for_aps(aps):
-        val = _choppable_get(aps, c)
-        val_len = len(val.encode())
-        if val_len > length_of_longest:
+    for c in choppables:
+        if c.length > length_of_longest:
             longest = c
-            length_of_longest = val_len
+            length_of_longest = c.length
     return longest
+
+
+def _min_length_to_stay_longest(
+    choppables: List[Choppable], choppable: Choppable
+) -> int:
+    """
+    Returns the minimum length, in bytes, that the given choppable must have in
+    order to still be picked by `_longest_choppable`.
+    """
+    min_length = 1
+    seen = False
+    for c in choppables:
+        if c is choppable:
+            seen = True
+            continue
+        # ties are won by whichever choppable comes first
+        min_length = max(min_length, c.length if seen else c.length + 1)
+    return min_length
@@ -7,6 +7,7 @@
 #
 # Originally licensed under the Apache License, Version 2.0:
 # <http://www.apache.org/licenses/LICENSE-2.0>.
+from functools import lru_cache
 from typing import NamedTuple, Optional, Tuple
 from urllib.parse import urlparse
 
@@ -23,6 +24,10 @@ HttpProxyUrl = NamedTuple(
 )
 
 
+# The proxy URL comes from the config, so there are only ever a handful of
+# distinct values, but it gets parsed for every new connection made through
+# the proxy.
+@lru_cache(maxsize=16)
 def decompose_http_proxy_url(proxy_url: str) -> HttpProxyUrl:
     """
     Given a HTTP proxy URL, breaks it down into components and checks that it
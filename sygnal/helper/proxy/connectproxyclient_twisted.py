@@ -11,8 +11,7 @@
 # https://github.com/element-hq/synapse/blob/6920e58136671f086536332bdd6844dff0d4b429/synapse/http/connectproxyclient.py
 
 import logging
-from base64 import urlsafe_b64encode
-from typing import Optional, Tuple
+from typing import Optional
 
 from twisted.internet import defer, protocol
 from twisted.internet.base import ReactorBase
@@ -50,8 +49,8 @@ class HTTPConnectProxyEndpoint:
         proxy_endpoint: the endpoint to use to connect to the proxy
         host: hostname that we want to CONNECT to
         port: port that we want to connect to
-        proxy_auth: None or tuple of (username, pasword) for HTTP basic proxy
-            authentication
+        proxy_auth_header: None or the value of the Proxy-Authorization header
+            to send to the proxy
     """
 
     def __init__(
@@ -60,22 +59,23 @@ class HTTPConnectProxyEndpoint:
         proxy_endpoint: IStreamClientEndpoint,
         host: bytes,
         port: int,
-        proxy_auth: Optional[Tuple[str, str]],
+        proxy_auth_header: Optional[bytes],
     ):
         self._reactor = reactor
         self._proxy_endpoint = proxy_endpoint
-        self._host = host
-        self._port = port
-        self._proxy_auth = proxy_auth
+        # The endpoint is reused for every connection to the same destination,
+        # so build the CONNECT request once, up front.
+        connect_request = b"CONNECT %s:%d HTTP/1.0\r\n" % (host, port)
+        if proxy_auth_header is not None:
+            connect_request += b"Proxy-Authorization: %s\r\n" % (proxy_auth_header,)
+        self._connect_request = connect_request + b"\r\n"
 
     def __repr__(self) -> str:
         return "<HTTPConnectProxyEndpoint %s>" % (self._proxy_endpoint,)
 
     def connect(self, protocolFactory: IProtocolFactory) -> "defer.Deferred[IProtocol]":
         assert isinstance(protocolFactory, protocol.ClientFactory)
-        f = HTTPProxiedClientFactory(
-            self._host, self._port, self._proxy_auth, protocolFactory
-        )
+        f = HTTPProxiedClientFactory(self._connect_request, protocolFactory)
         d = self._proxy_endpoint.connect(f)
         # once the tcp socket connects successfully, we need to wait for the
         # CONNECT to complete.
@@ -91,23 +91,16 @@ class HTTPProxiedClientFactory(protocol.ClientFactory):
      connection.
 
     Args:
-        dst_host: hostname that we want to CONNECT to
-        dst_port: port that we want to connect to
-        proxy_auth: None or tuple of (username, pasword) for HTTP basic proxy
-            authentication
+        connect_request: the complete CONNECT request to send to the proxy
         wrapped_factory: The original Factory
     """
 
     def __init__(
         self,
-        dst_host: bytes,
-        dst_port: int,
-        proxy_auth: Optional[Tuple[str, str]],
+        connect_request: bytes,
         wrapped_factory: protocol.ClientFactory,
     ):
-        self.dst_host = dst_host
-        self.dst_port = dst_port
-        self._proxy_auth = proxy_auth
+        self.connect_request = connect_request
         self.wrapped_factory = wrapped_factory
         self.on_connection: defer.Deferred = defer.Deferred()
 
@@ -119,9 +112,7 @@ class HTTPProxiedClientFactory(protocol.ClientFactory):
         assert wrapped_protocol is not None
 
         return HTTPConnectProtocol(
-            self.dst_host,
-            self.dst_port,
-            self._proxy_auth,
+            self.connect_request,
             wrapped_protocol,
             self.on_connection,
         )
@@ -143,13 +134,9 @@ class HTTPConnectProtocol(protocol.Protocol):
     """Protocol that wraps an existing Protocol to do a CONNECT handshake at connect
 
     Args:
-        host: The original HTTP(s) hostname or IPv4 or IPv6 address literal
-            to put in the CONNECT request
-
-        port: The original HTTP(s) port to put in the CONNECT request
-
-        proxy_auth: None or tuple of (username, pasword) for HTTP basic proxy
-            authentication
+        connect_request: The complete CONNECT request to send to the proxy,
+            for the original HTTP(s) hostname (or IPv4 or IPv6 address literal)
+            and port
 
         wrapped_protocol: the original protocol (probably
             HTTPChannel or TLSMemoryBIOProtocol, but could be anything really)
@@ -160,19 +147,14 @@ class HTTPConnectProtocol(protocol.Protocol):
 
     def __init__(
         self,
-        host: bytes,
-        port: int,
-        proxy_auth: Optional[Tuple[str, str]],
+        connect_request: bytes,
         wrapped_protocol: Protocol,
         connected_deferred: Deferred,
     ):
-        self.host = host
-        self.port = port
+        self.connect_request = connect_request
         self.wrapped_protocol = wrapped_protocol
         self.connected_deferred = connected_deferred
-        self.http_setup_client = HTTPConnectSetupClient(
-            self.host, self.port, proxy_auth
-        )
+        self.http_setup_client = HTTPConnectSetupClient(self.connect_request)
         self.http_setup_client.on_connected.addCallback(self.proxyConnected)
 
     def connectionMade(self) -> None:
@@ -211,27 +193,19 @@ class HTTPConnectSetupClient(http.HTTPClient):
     """HTTPClient protocol to send a CONNECT message for proxies and read the response.
 
     Args:
-        host: The hostname to send in the CONNECT message
-        port: The port to send in the CONNECT message
-        proxy_auth: None or tuple of (username, pasword) for HTTP basic proxy
-            authentication
+        connect_request: The complete CONNECT message to send
     """
 
-    def __init__(self, host: bytes, port: int, proxy_auth: Optional[Tuple[str, str]]):
-        self.host = host
-        self.port = port
-        self._proxy_auth = proxy_auth
+    def __init__(self, connect_request: bytes):
+        self.connect_request = connect_request
         self.on_connected: defer.Deferred = defer.Deferred()
 
     def connectionMade(self) -> None:
         logger.debug("Connected to proxy, sending CONNECT")
-        self.sendCommand(b"CONNECT", b"%s:%d" % (self.host, self.port))
-        if self._proxy_auth is not None:
-            username, password = self._proxy_auth
-            # a credential pair is a urlsafe-base64-encoded pair separated by colon
-            encoded_credentials = urlsafe_b64encode(f"{username}:{password}".encode())
-            self.sendHeader(b"Proxy-Authorization", b"basic " + encoded_credentials)
-        self.endHeaders()
+        # Send the whole request in one go, rather than piecemeal via
+        # sendCommand/sendHeader/endHeaders.
+        assert self.transport is not None
+        self.transport.write(self.connect_request)
 
     def handleStatus(self, version: bytes, status: bytes, message: bytes) -> None:
         logger.debug("Got Status: %s %s %s", status, message, version)
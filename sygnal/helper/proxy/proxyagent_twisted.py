@@ -11,12 +11,17 @@
 # https://github.com/element-hq/synapse/blob/6920e58136671f086536332bdd6844dff0d4b429/synapse/http/proxyagent.py
 
 import logging
-import re
-from typing import Any, Dict, Optional
+from base64 import urlsafe_b64encode
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
 
 from twisted.internet import defer
 from twisted.internet.endpoints import HostnameEndpoint, wrapClientTLS
-from twisted.internet.interfaces import IReactorCore, IStreamClientEndpoint
+from twisted.internet.interfaces import (
+    IOpenSSLClientConnectionCreator,
+    IReactorCore,
+    IStreamClientEndpoint,
+)
 from twisted.python.failure import Failure
 from twisted.web.client import (
     URI,
@@ -34,7 +39,35 @@ from sygnal.helper.proxy.connectproxyclient_twisted import HTTPConnectProxyEndpo
 
 logger = logging.getLogger(__name__)
 
-_VALID_URI = re.compile(rb"\A[\x21-\x7e]+\Z")
+# All the bytes which may not appear in a URI (i.e. anything outside of the
+# printable, non-space ASCII range).
+# Stripping these with `bytes.translate` is cheaper than matching a regex.
+_INVALID_URI_BYTES = bytes(b for b in range(256) if not 0x21 <= b <= 0x7E)
+
+# The maximum number of hosts to keep TLS connection creators and proxy
+# endpoints around for, per agent.
+_MAX_CACHED_HOSTS = 64
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+def _get_or_create(cache: "OrderedDict[K, V]", key: K, create: Callable[[], V]) -> V:
+    """
+    Looks up `key` in the given LRU cache, calling `create` to make the value
+    (and evicting the least recently used entry if the cache is full) if it is
+    not present.
+    """
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+        return value
+
+    value = create()
+    cache[key] = value
+    if len(cache) > _MAX_CACHED_HOSTS:
+        cache.popitem(last=False)
+    return value
 
 
 @implementer(IAgent)
@@ -77,7 +110,16 @@ class ProxyAgent(_AgentBase):
 
         if proxy_url_str is not None:
             parsed_url = decompose_http_proxy_url(proxy_url_str)
-            self._proxy_auth = parsed_url.credentials
+            # The credentials never change, so build the Proxy-Authorization
+            # header up front rather than for every connection to the proxy.
+            self._proxy_auth_header: Optional[bytes] = None
+            if parsed_url.credentials is not None:
+                username, password = parsed_url.credentials
+                # a credential pair is a urlsafe-base64-encoded pair separated by
+                # colon
+                self._proxy_auth_header = b"basic " + urlsafe_b64encode(
+                    f"{username}:{password}".encode()
+                )
 
             self.proxy_endpoint: Optional[HostnameEndpoint] = HostnameEndpoint(
                 reactor, parsed_url.hostname, parsed_url.port, **self._endpoint_kwargs
@@ -88,6 +130,17 @@ class ProxyAgent(_AgentBase):
         self._policy_for_https = contextFactory
         self._reactor = reactor
 
+        # We tend to talk to the same few hosts over and over again, so keep
+        # hold of the TLS connection creators for them rather than building a
+        # new one for every request.
+        self._tls_connection_creators: OrderedDict[
+            Tuple[bytes, int], IOpenSSLClientConnectionCreator
+        ] = OrderedDict()
+        # Likewise for the endpoints used to CONNECT through the proxy.
+        self._https_proxy_endpoints: OrderedDict[
+            Tuple[bytes, int], HTTPConnectProxyEndpoint
+        ] = OrderedDict()
+
     def request(
         self,
         method: bytes,
@@ -122,7 +175,7 @@ class ProxyAgent(_AgentBase):
                 (regardless of the response status code).
         """
         uri = uri.strip()
-        if not _VALID_URI.match(uri):
+        if not uri or len(uri.translate(None, _INVALID_URI_BYTES)) != len(uri):
             raise ValueError("Invalid URI {!r}".format(uri))
 
         parsed_uri = URI.fromBytes(uri)
@@ -137,12 +190,17 @@ class ProxyAgent(_AgentBase):
             endpoint = self.proxy_endpoint
             request_path = uri
         elif parsed_uri.scheme == b"https" and self.proxy_endpoint:
-            endpoint = HTTPConnectProxyEndpoint(
-                self._reactor,
-                self.proxy_endpoint,
-                parsed_uri.host,
-                parsed_uri.port,
-                self._proxy_auth,
+            proxy_endpoint = self.proxy_endpoint
+            endpoint = _get_or_create(
+                self._https_proxy_endpoints,
+                (parsed_uri.host, parsed_uri.port),
+                lambda: HTTPConnectProxyEndpoint(
+                    self._reactor,
+                    proxy_endpoint,
+                    parsed_uri.host,
+                    parsed_uri.port,
+                    self._proxy_auth_header,
+                ),
             )
         else:
             # not using a proxy
@@ -153,8 +211,12 @@ class ProxyAgent(_AgentBase):
         logger.debug("Requesting %s via %s", uri, endpoint)
 
         if parsed_uri.scheme == b"https":
-            tls_connection_creator = self._policy_for_https.creatorForNetloc(
-                parsed_uri.host, parsed_uri.port
+            tls_connection_creator = _get_or_create(
+                self._tls_connection_creators,
+                (parsed_uri.host, parsed_uri.port),
+                lambda: self._policy_for_https.creatorForNetloc(
+                    parsed_uri.host, parsed_uri.port
+                ),
             )
             endpoint = wrapClientTLS(tls_connection_creator, endpoint)
         elif parsed_uri.scheme == b"http":
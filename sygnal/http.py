@@ -210,18 +210,18 @@ class V1NotifyHandler(Resource):
         Returns:
             list of `Pushkin`: If it finds a specific pushkin with
                 the exact app id, immediately returns it.
-                Otherwise returns possible pushkins.
+                Otherwise returns the pushkins whose app ID patterns match, but
+                at most two of them: that is enough for callers to tell no
+                match, a single match and an ambiguous app ID apart.
         """
         # if found a specific appid, just return it as a list
         if appid in self.sygnal.pushkins:
             return [self.sygnal.pushkins[appid]]
 
-        # otherwise, find any pushkins whose appid patterns match
-        return [
-            pushkin
-            for pushkin in self.sygnal.pushkins.values()
-            if pushkin.handles_appid(appid)
-        ]
+        # otherwise, find any pushkins whose appid patterns match.
+        # We only accept a single match, so there's no point looking for more
+        # than two.
+        return self.sygnal.pushkin_trie.match(appid, limit=2)
 
     async def _handle_dispatch(
         self,
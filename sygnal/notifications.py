@@ -9,8 +9,20 @@
 # Originally licensed under the Apache License, Version 2.0:
 # <http://www.apache.org/licenses/LICENSE-2.0>.
 import abc
-from typing import TYPE_CHECKING, Any, Dict, List, Optional, Type, TypeVar, overload
+import re
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Type,
+    TypeVar,
+    overload,
+)
 
+import attr
 from matrix_common.regex import glob_to_regex
 from opentracing import Span
 from prometheus_client import Counter
@@ -26,6 +38,9 @@ if TYPE_CHECKING:
 
 T = TypeVar("T")
 
+# the characters with a special meaning in an app ID pattern
+_WILDCARD = re.compile(r"[?*]")
+
 
 @overload
 def get_key(raw: Dict[str, Any], key: str, type_: Type[T], default: T) -> T: ...
@@ -230,3 +245,52 @@ class NotificationContext(object):
         self.request_id = request_id
         self.opentracing_span = opentracing_span
         self.start_time = start_time
+
+
+class PushkinTrie:
+    """
+    An index of pushkins, used to find the ones responsible for an app ID.
+
+    Pushkins are stored in a character trie keyed by the literal prefix of their
+    app ID pattern (i.e. everything before the first wildcard), so that looking
+    up an app ID only needs to check the patterns of the pushkins whose prefix
+    the app ID starts with, rather than those of every pushkin.
+    """
+
+    def __init__(self, pushkins: Iterable[Pushkin]):
+        self._root = _PushkinTrieNode()
+        for pushkin in pushkins:
+            node = self._root
+            for char in _WILDCARD.split(pushkin.name, maxsplit=1)[0]:
+                node = node.children.setdefault(char, _PushkinTrieNode())
+            node.pushkins.append(pushkin)
+
+    def match(self, appid: str, limit: Optional[int] = None) -> List[Pushkin]:
+        """
+        Finds the pushkins which handle the given app ID.
+
+        Args:
+            appid: the app ID to look up.
+            limit: if given, stop looking once this many pushkins have been found.
+
+        Returns:
+            the pushkins whose app ID pattern matches `appid`.
+        """
+        found: List[Pushkin] = []
+        node: Optional[_PushkinTrieNode] = self._root
+        chars = iter(appid)
+        while node is not None:
+            for pushkin in node.pushkins:
+                if pushkin.handles_appid(appid):
+                    found.append(pushkin)
+                    if len(found) == limit:
+                        return found
+            node = node.children.get(next(chars, ""))
+        return found
+
+
+@attr.s(slots=True, auto_attribs=True)
+class _PushkinTrieNode:
+    # the pushkins whose app ID pattern has a literal prefix ending here
+    pushkins: List[Pushkin] = attr.Factory(list)
+    children: Dict[str, "_PushkinTrieNode"] = attr.Factory(dict)
@@ -36,7 +36,7 @@ from twisted.python.failure import Failure
 from zope.interface import Interface
 
 from sygnal.http import PushGatewayApiServer
-from sygnal.notifications import Pushkin
+from sygnal.notifications import Pushkin, PushkinTrie
 from sygnal.utils import twisted_sleep
 
 logger = logging.getLogger(__name__)
@@ -87,6 +87,8 @@ class Sygnal:
         self.config = config
         self.reactor = custom_reactor
         self.pushkins: Dict[str, Pushkin] = {}
+        # index of `pushkins` by app ID pattern, for app IDs without an exact match
+        self.pushkin_trie = PushkinTrie([])
         self.tracer = tracer
 
         logging_dict_config = config["log"]["setup"]
@@ -207,6 +209,8 @@ class Sygnal:
 
         logger.info("Configured with app IDs: %r", self.pushkins.keys())
 
+        self.pushkin_trie = PushkinTrie(self.pushkins.values())
+
         pushgateway_api = PushGatewayApiServer(self)
         port = int(self.config["http"]["port"])
         for interface in self.config["http"]["bind_addresses"]:
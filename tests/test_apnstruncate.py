@@ -68,6 +68,13 @@ class TruncateTestCase(unittest.TestCase):
         aps = {"alert": txt}
         self.assertEqual(txt, truncate(payload_for_aps(aps), 256)["aps"]["alert"])
 
+    def test_dont_copy_if_fits(self) -> None:
+        """
+        Tests that a payload which already fits is returned as-is.
+        """
+        payload = payload_for_aps({"alert": simplestring(20)})
+        self.assertIs(payload, truncate(payload, 256))
+
     def test_truncate_alert(self) -> None:
         """
         Tests that the 'alert' string field will be truncated when needed.
@@ -171,3 +178,32 @@ class TruncateTestCase(unittest.TestCase):
         # NB. The number of characters of the string we get is dependent
         # on the json encoding used.
         self.assertEqual(txt[:7], trunc["aps"]["alert"])
+
+    def test_truncate_uneven_loc_args(self) -> None:
+        """
+        Tests that the longest 'loc-args' are truncated first, until they are
+        all even in length.
+        """
+        overhead = len(json_encode(payload_for_aps({"alert": {"loc-args": ["", ""]}})))
+        txt = simplestring(100)
+        txt2 = simplestring(50, 3)
+        aps = {"alert": {"loc-args": [txt, txt2]}}
+        loc_args = truncate(payload_for_aps(aps), overhead + 61)["aps"]["alert"][
+            "loc-args"
+        ]
+        # ties are broken in favour of chopping the first loc-arg
+        self.assertEqual(txt[:30], loc_args[0])
+        self.assertEqual(txt2[:31], loc_args[1])
+
+    def test_truncate_escaped_characters(self) -> None:
+        """
+        Tests that truncation accounts for characters which need escaping
+        when JSON-encoded.
+        """
+        overhead = len(json_encode(payload_for_aps({"alert": ""})))
+        txt = '"\n' * 10
+        aps = {"alert": txt}
+        # each character occupies two bytes once escaped
+        self.assertEqual(
+            txt[:5], truncate(payload_for_aps(aps), overhead + 11)["aps"]["alert"]
+        )
@@ -7,7 +7,7 @@
 # Originally licensed under the Apache License, Version 2.0:
 # <http://www.apache.org/licenses/LICENSE-2.0>.
 from typing import Any, Dict
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
 
 from aioapns.common import NotificationResult
 
@@ -42,22 +42,57 @@ DEVICE_EXAMPLE_AMBIGIOUS = {
     "pushkey_ts": 42,
 }
 
+# App id which matches none of the pushkins
+DEVICE_EXAMPLE_UNMATCHED = {
+    "app_id": "org.example",
+    "pushkey": "spqr",
+    "pushkey_ts": 42,
+}
 
-class HttpTestCase(testutils.TestCase):
-    def setUp(self) -> None:
-        self.apns_mock_class = patch("sygnal.apnspushkin.APNs").start()
-        self.apns_mock = MagicMock()
-        self.apns_mock_class.return_value = self.apns_mock
 
-        # pretend our certificate exists
-        patch("os.path.exists", lambda x: x == TEST_CERTFILE_PATH).start()
-        # Since no certificate exists, don't try to read it.
-        patch("sygnal.apnspushkin.ApnsPushkin._report_certificate_expiration").start()
-        self.addCleanup(patch.stopall)
+class _CallCounter:
+    """
+    A stand-in for an async method which just counts how often it is called.
+
+    This is all these tests need, without the overhead of a MagicMock recording
+    every call.
+    """
 
+    def __init__(self) -> None:
+        self.return_value: Any = None
+        self.call_count = 0
+
+    async def __call__(self, *args: Any, **kwargs: Any) -> Any:
+        self.call_count += 1
+        return self.return_value
+
+
+class HttpTestCase(testutils.TestCase):
+    # every test replaces the pushkins' `_send_notification`, so they don't
+    # interfere with each other
+    share_sygnal = True
+
+    def _start_sygnal(self) -> None:
+        # The patches are only needed while the pushkins are being created,
+        # which (with the Sygnal being shared) only happens for the first test.
+        with (
+            patch("sygnal.apnspushkin.APNs"),
+            patch(
+                # pretend our certificate exists
+                "os.path.exists",
+                lambda x: x == TEST_CERTFILE_PATH,
+            ),
+            patch(
+                # Since no certificate exists, don't try to read it.
+                "sygnal.apnspushkin.ApnsPushkin._report_certificate_expiration"
+            ),
+        ):
+            super()._start_sygnal()
+
+    def setUp(self) -> None:
         super().setUp()
 
-        self.apns_pushkin_snotif = MagicMock()
+        self.apns_pushkin_snotif = _CallCounter()
         for key, value in self.sygnal.pushkins.items():
             assert isinstance(value, ApnsPushkin)
             # type safety: ignore is used here due to mypy not handling monkeypatching,
@@ -76,9 +111,7 @@ class HttpTestCase(testutils.TestCase):
         """
         # Arrange
         method = self.apns_pushkin_snotif
-        method.side_effect = testutils.make_async_magic_mock(
-            NotificationResult("notID", "200")
-        )
+        method.return_value = NotificationResult("notID", "200")
 
         # Act
         resp = self._request(self._make_dummy_notification([DEVICE_EXAMPLE_SPECIFIC]))
@@ -95,9 +128,7 @@ class HttpTestCase(testutils.TestCase):
         """
         # Arrange
         method = self.apns_pushkin_snotif
-        method.side_effect = testutils.make_async_magic_mock(
-            NotificationResult("notID", "200")
-        )
+        method.return_value = NotificationResult("notID", "200")
 
         # Act
         resp = self._request(self._make_dummy_notification([DEVICE_EXAMPLE_MATCHING]))
@@ -123,3 +154,17 @@ class HttpTestCase(testutils.TestCase):
         # must be rejected without calling the method
         self.assertEqual(0, method.call_count)
         self.assertEqual({"rejected": ["spqr"]}, resp)
+
+    def test_with_unmatched_appid(self) -> None:
+        """
+        Tests the rejection case: An app id matching no pushkin should be rejected.
+        """
+        # Arrange
+        method = self.apns_pushkin_snotif
+
+        # Act
+        resp = self._request(self._make_dummy_notification([DEVICE_EXAMPLE_UNMATCHED]))
+
+        # Assert
+        self.assertEqual(0, method.call_count)
+        self.assertEqual({"rejected": ["spqr"]}, resp)
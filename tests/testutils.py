@@ -10,8 +10,8 @@
 import asyncio
 import json
 from io import BytesIO
-from threading import Condition
-from typing import BinaryIO, Dict, List, Optional, Union
+from threading import Event
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple, Union
 
 import attr
 import twisted
@@ -31,130 +31,113 @@ from sygnal.sygnal import CONFIG_DEFAULTS, Sygnal, merge_left_with_defaults
 from tests.asyncio_test_helpers import TimelessEventLoopWrapper
 
 REQ_PATH = b"/_matrix/push/v1/notify"
-
-
-class TestCase(unittest.TestCase):
-    def config_setup(self, config):
-        pass
-
-    def setUp(self):
-        reactor = ExtendedMemoryReactorClock()
-
-        logging_config = {
-            "setup": {
-                "disable_existing_loggers": False,  # otherwise this breaks logging!
-                "formatters": {
-                    "normal": {
-                        "format": "%(asctime)s [%(process)d] "
-                        "%(levelname)-5s %(name)s %(message)s"
-                    }
-                },
-                "handlers": {
-                    "stderr": {
-                        "class": "logging.StreamHandler",
-                        "formatter": "normal",
-                        "stream": "ext://sys.stderr",
-                    },
-                },
-                "loggers": {
-                    "sygnal": {"handlers": ["stderr"], "propagate": False},
-                    "sygnal.access": {
-                        "handlers": ["stderr"],
-                        "level": "INFO",
-                        "propagate": False,
-                    },
-                },
-                "root": {"handlers": ["stderr"], "level": "DEBUG"},
-                "version": 1,
+# the method, path and HTTP version of a request to the notify endpoint
+_POST_REQ = (b"POST", REQ_PATH, b"1.1")
+
+_LOGGING_CONFIG = {
+    "setup": {
+        "disable_existing_loggers": False,  # otherwise this breaks logging!
+        "formatters": {
+            "normal": {
+                "format": "%(asctime)s [%(process)d] "
+                "%(levelname)-5s %(name)s %(message)s"
             }
-        }
-
-        config = {"apps": {}, "log": logging_config}
-
-        self.loop: Union[asyncio.AbstractEventLoop, TimelessEventLoopWrapper] = (
-            asyncio.new_event_loop()
-        )
-        self.config_setup(config)
-        # Manually set the running loop after calling config_setup since self.loop
-        # can be modified inside config_setup.
-        # asyncio doesn't set this itself for some reason when calling `set_event_loop`.
-        asyncio._set_running_loop(self.loop)
-
-        config = merge_left_with_defaults(CONFIG_DEFAULTS, config)
-
-        self.sygnal = Sygnal(config, reactor)  # type: ignore[arg-type]
-        self.reactor = reactor
-
-        start_deferred = ensureDeferred(self.sygnal.make_pushkins_then_start())
-
-        while not start_deferred.called:
-            # we need to advance until the pushkins have started up
-            self.reactor.advance(1)
-            self.reactor.wait_for_work(lambda: start_deferred.called)
-
-        # sygnal should have started a single (fake) tcp listener
-        listeners = self.reactor.tcpServers
-        self.assertEqual(len(listeners), 1)
-        (port, site, _backlog, interface) = listeners[0]
-        self.site = site
-
-    def _make_dummy_notification(self, devices):
-        return {
-            "notification": {
-                "id": "$3957tyerfgewrf384",
-                "room_id": "!slw48wfj34rtnrf:example.com",
-                "event_id": "$qTOWWTEL48yPm3uT-gdNhFcoHxfKbZuqRVnnWWSkGBs",
-                "type": "m.room.message",
-                "sender": "@exampleuser:matrix.org",
-                "sender_display_name": "Major Tom",
-                "room_name": "Mission Control",
-                "room_alias": "#exampleroom:matrix.org",
-                "prio": "high",
-                "content": {
-                    "msgtype": "m.text",
-                    "body": "I'm floating in a most peculiar way.",
-                    "other": 1,
-                },
-                "counts": {"unread": 2, "missed_calls": 1},
-                "devices": devices,
-            }
-        }
-
-    def _make_dummy_notification_event_id_only(self, devices):
-        return {
-            "notification": {
-                "room_id": "!slw48wfj34rtnrf:example.com",
-                "event_id": "$qTOWWTEL48yPm3uT-gdNhFcoHxfKbZuqRVnnWWSkGBs",
-                "counts": {"unread": 2},
-                "devices": devices,
-            }
-        }
-
-    def _make_dummy_notification_badge_only(self, devices):
-        return {
-            "notification": {
-                "id": "",
-                "type": None,
-                "sender": "",
-                "counts": {"unread": 2},
-                "devices": devices,
-            }
-        }
-
-    # NOTE: The `⚑` character (len 3 bytes) is inserted at byte position 1020 (occupying 1020-1022).
-    # This will make the truncation (which is `str[: 1024 - 3]`) occur in the middle of a unicode
-    # character. The truncation logic should recognize this and return the string starting before
-    # the `⚑`, with a `…` appended to indicate the string was truncated.
-    def _make_dummy_notification_large_fields(self, devices):
-        return {
-            "notification": {
-                "id": "$3957tyerfgewrf384",
-                "room_id": "!slw48wfj34rtnrf:example.com",
-                "event_id": "$qTOWWTEL48yPm3uT-gdNhFcoHxfKbZuqRVnnWWSkGBs",
-                "type": "m.room.message",
-                "sender": "@exampleuser:matrix.org",
-                "sender_display_name": "Major Tom",
-                "room_name": "xxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxoooooooooo\
+        },
+        "handlers": {
+            "stderr": {
+                "class": "logging.StreamHandler",
+                "formatter": "normal",
+                "stream": "ext://sys.stderr",
+            },
+        },
+        "loggers": {
+            "sygnal": {"handlers": ["stderr"], "propagate": False},
+            "sygnal.access": {
+                "handlers": ["stderr"],
+                "level": "INFO",
+                "propagate": False,
+            },
+        },
+        "root": {"handlers": ["stderr"], "level": "DEBUG"},
+        "version": 1,
+    }
+}
+
+# The config for every test whose `config_setup` only sets the apps.
+# (Sygnal sets top-level keys on its config, so this must be copied before use.)
+_BASE_CONFIG = merge_left_with_defaults(
+    CONFIG_DEFAULTS, {"apps": {}, "log": _LOGGING_CONFIG}
+)
+
+# Request bodies are encoded compactly, and as UTF-8 rather than with non-ASCII
+# characters escaped, to keep them small.
+_json_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+def _json_encode(value: Any) -> bytes:
+    return _json_encoder.encode(value).encode()
+
+
+# A placeholder for the list of devices in the notification templates below.
+_DEVICES_PLACEHOLDER = "__DEVICES__"
+
+
+def _notification_template(notification: Dict[str, Any]) -> Tuple[bytes, bytes]:
+    """
+    JSON-encodes a notification up front, split around where its devices go so
+    that they can be filled in by `_fill_devices`.
+    """
+    notification = dict(notification, devices=_DEVICES_PLACEHOLDER)
+    encoded = _json_encode({"notification": notification})
+    before, _, after = encoded.partition(_json_encode(_DEVICES_PLACEHOLDER))
+    return before, after
+
+
+def _fill_devices(
+    template: Tuple[bytes, bytes], devices: List[Dict[str, Any]]
+) -> bytes:
+    before, after = template
+    return b"".join((before, _json_encode(devices), after))
+
+
+_DUMMY_NOTIFICATION = _notification_template(
+    {
+        "id": "$3957tyerfgewrf384",
+        "room_id": "!slw48wfj34rtnrf:example.com",
+        "event_id": "$qTOWWTEL48yPm3uT-gdNhFcoHxfKbZuqRVnnWWSkGBs",
+        "type": "m.room.message",
+        "sender": "@exampleuser:matrix.org",
+        "sender_display_name": "Major Tom",
+        "room_name": "Mission Control",
+        "room_alias": "#exampleroom:matrix.org",
+        "prio": "high",
+        "content": {
+            "msgtype": "m.text",
+            "body": "I'm floating in a most peculiar way.",
+            "other": 1,
+        },
+        "counts": {"unread": 2, "missed_calls": 1},
+    }
+)
+
+_DUMMY_NOTIFICATION_EVENT_ID_ONLY = _notification_template(
+    {
+        "room_id": "!slw48wfj34rtnrf:example.com",
+        "event_id": "$qTOWWTEL48yPm3uT-gdNhFcoHxfKbZuqRVnnWWSkGBs",
+        "counts": {"unread": 2},
+    }
+)
+
+_DUMMY_NOTIFICATION_BADGE_ONLY = _notification_template(
+    {
+        "id": "",
+        "type": None,
+        "sender": "",
+        "counts": {"unread": 2},
+    }
+)
+
+_LARGE_ROOM_NAME = "xxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxoooooooooo\
 xxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxx\
 ooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxoooooooooo\
 xxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxx\
@@ -188,13 +171,13 @@ ooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxoooooooooo\
 xxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxx\
 ooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxoooooooooo\
 xxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxx\
-ooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxoooooooooo",
-                "room_alias": "#exampleroom:matrix.org",
-                "prio": "high",
-                "content": {
-                    "msgtype": "m.text",
-                    "body": "I'm floating in a most peculiar way.",
-                    "other": "xxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxoooooooooo\
+ooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxoooooooooo"
+
+# NOTE: The `⚑` character (len 3 bytes) is inserted at byte position 1020 (occupying 1020-1022).
+# This will make the truncation (which is `str[: 1024 - 3]`) occur in the middle of a unicode
+# character. The truncation logic should recognize this and return the string starting before
+# the `⚑`, with a `…` appended to indicate the string was truncated.
+_LARGE_CONTENT = "xxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxoooooooooo\
 xxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxx\
 ooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxoooooooooo\
 xxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxx\
@@ -228,36 +211,131 @@ ooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxoooooooooo\
 xxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxx\
 ooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxoooooooooo\
 xxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxx\
-ooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxoooooooooo",
-                },
-                "counts": {"unread": 2, "missed_calls": 1},
-                "devices": devices,
-            }
-        }
+ooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxoooooooooo"
+
+_DUMMY_NOTIFICATION_LARGE_FIELDS = _notification_template(
+    {
+        "id": "$3957tyerfgewrf384",
+        "room_id": "!slw48wfj34rtnrf:example.com",
+        "event_id": "$qTOWWTEL48yPm3uT-gdNhFcoHxfKbZuqRVnnWWSkGBs",
+        "type": "m.room.message",
+        "sender": "@exampleuser:matrix.org",
+        "sender_display_name": "Major Tom",
+        "room_name": _LARGE_ROOM_NAME,
+        "room_alias": "#exampleroom:matrix.org",
+        "prio": "high",
+        "content": {
+            "msgtype": "m.text",
+            "body": "I'm floating in a most peculiar way.",
+            "other": _LARGE_CONTENT,
+        },
+        "counts": {"unread": 2, "missed_calls": 1},
+    }
+)
+
+
+class TestCase(unittest.TestCase):
+    # Whether all the tests in the class can share a single Sygnal instance,
+    # started by the first of them, rather than each starting their own.
+    # Only suitable for tests which don't depend on (or leave behind) any state
+    # in Sygnal, its pushkins or the reactor.
+    # (trial doesn't support setUpClass, so this is done lazily in setUp instead.)
+    share_sygnal = False
+    _sygnal_owner: Optional["TestCase"] = None
+
+    def config_setup(self, config):
+        pass
 
-    def _request(self, payload: Union[str, dict]) -> Union[dict, int]:
+    def _start_sygnal(self):
+        reactor = ExtendedMemoryReactorClock()
+
+        config = {"apps": {}, "log": _LOGGING_CONFIG}
+
+        self.loop: Union[asyncio.AbstractEventLoop, TimelessEventLoopWrapper] = (
+            asyncio.new_event_loop()
+        )
+        self.config_setup(config)
+        # Manually set the running loop after calling config_setup since self.loop
+        # can be modified inside config_setup.
+        # asyncio doesn't set this itself for some reason when calling `set_event_loop`.
+        asyncio._set_running_loop(self.loop)
+
+        if config.keys() == {"apps", "log"} and config["log"] is _LOGGING_CONFIG:
+            # config_setup only filled in the apps, so the rest of the config has
+            # already been merged with the defaults, up front.
+            config = dict(_BASE_CONFIG, apps=config["apps"])
+        else:
+            config = merge_left_with_defaults(CONFIG_DEFAULTS, config)
+
+        self.sygnal = Sygnal(config, reactor)  # type: ignore[arg-type]
+        self.reactor = reactor
+
+        start_deferred = ensureDeferred(self.sygnal.make_pushkins_then_start())
+
+        # we need to advance until the pushkins have started up
+        self._drain_until(lambda: start_deferred.called)
+
+        # sygnal should have started a single (fake) tcp listener
+        listeners = self.reactor.tcpServers
+        self.assertEqual(len(listeners), 1)
+        (port, site, _backlog, interface) = listeners[0]
+        self.site = site
+
+    def setUp(self):
+        # look at this class only, so that subclasses don't share with their parent
+        owner: Optional[TestCase] = type(self).__dict__.get("_sygnal_owner")
+        if owner is None:
+            self._start_sygnal()
+            if self.share_sygnal:
+                type(self)._sygnal_owner = self
+            return
+
+        self.loop = owner.loop
+        self.sygnal = owner.sygnal
+        self.reactor = owner.reactor
+        self.site = owner.site
+        asyncio._set_running_loop(self.loop)  # type: ignore[arg-type]
+
+    def _drain_until(self, done: Callable[[], bool]) -> None:
+        """
+        Runs the reactor's delayed calls, waiting for more work whenever there
+        is none, until `done` returns True.
+        """
+        while not done():
+            self.reactor.advance_to_next_call()
+            self.reactor.wait_for_work(done)
+
+    def _make_dummy_notification(self, devices):
+        return _fill_devices(_DUMMY_NOTIFICATION, devices)
+
+    def _make_dummy_notification_event_id_only(self, devices):
+        return _fill_devices(_DUMMY_NOTIFICATION_EVENT_ID_ONLY, devices)
+
+    def _make_dummy_notification_badge_only(self, devices):
+        return _fill_devices(_DUMMY_NOTIFICATION_BADGE_ONLY, devices)
+
+    def _make_dummy_notification_large_fields(self, devices):
+        return _fill_devices(_DUMMY_NOTIFICATION_LARGE_FIELDS, devices)
+
+    def _request(self, payload: Union[str, dict, bytes]) -> Union[dict, int]:
         """
         Make a dummy request to the notify endpoint with the specified payload
 
         Args:
-            payload: payload to be JSON encoded
+            payload: payload to be JSON encoded, unless it is already bytes
 
         Returns (dict or int):
             If successful (200 response received), the response is JSON decoded
             and the resultant dict is returned.
             If the response code is not 200, returns the response code.
         """
-        if isinstance(payload, dict):
-            payload = json.dumps(payload)
-        content = BytesIO(payload.encode())
+        content = _encode_payload(payload)
 
         channel = FakeChannel(self.site, self.sygnal.reactor)
-        channel.process_request(b"POST", REQ_PATH, content)
+        channel.process_request(content)
 
-        while not channel.done:
-            # we need to advance until the request has been finished
-            self.reactor.advance(1)
-            self.reactor.wait_for_work(lambda: channel.done)
+        # we need to advance until the request has been finished
+        self._drain_until(lambda: channel.done)
 
         assert channel.done
         assert channel.result is not None
@@ -268,7 +346,7 @@ ooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxoooooooooo",
         return json.loads(channel.response_body)
 
     def _multi_requests(
-        self, payloads: List[Union[str, dict]]
+        self, payloads: List[Union[str, dict, bytes]]
     ) -> List[Union[dict, int]]:
         """
         Make multiple dummy requests to the notify endpoint with the specified payloads.
@@ -276,34 +354,33 @@ ooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxoooooooooo",
         Acts like a listified version of `_request`.
 
         Args:
-            payloads: list of payloads to be JSON encoded
+            payloads: list of payloads to be JSON encoded, unless already bytes
 
         Returns (lists of dicts and/or ints):
             If successful (200 response received), the response is JSON decoded
             and the resultant dict is returned.
             If the response code is not 200, returns the response code.
         """
+        contents = [_encode_payload(payload) for payload in payloads]
 
-        def dump_if_needed(payload):
-            if isinstance(payload, dict):
-                payload = json.dumps(payload)
-            return payload
+        # keep count of the requests still in flight as they finish, rather than
+        # checking every channel each time we wake up
+        remaining = len(contents)
 
-        contents = [BytesIO(dump_if_needed(payload).encode()) for payload in payloads]
+        def on_channel_done():
+            nonlocal remaining
+            remaining -= 1
 
-        channels = [FakeChannel(self.site, self.sygnal.reactor) for _ in contents]
+        channels = [
+            FakeChannel(self.site, self.sygnal.reactor, on_done=on_channel_done)
+            for _ in contents
+        ]
 
         for channel, content in zip(channels, contents):
-            channel.process_request(b"POST", REQ_PATH, content)
+            channel.process_request(content)
 
-        def all_channels_done():
-            return all(channel.done for channel in channels)
-
-        while not all_channels_done():
-            # we need to advance until the request has been finished
-            assert isinstance(self.sygnal.reactor, ExtendedMemoryReactorClock)
-            self.sygnal.reactor.advance(1)
-            self.sygnal.reactor.wait_for_work(all_channels_done)
+        # we need to advance until the requests have been finished
+        self._drain_until(lambda: remaining == 0)
 
         def channel_result(channel):
             if channel.result.code != 200:
@@ -314,11 +391,21 @@ ooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxooooooooooxxxxxxxxxxoooooooooo",
         return [channel_result(channel) for channel in channels]
 
 
+def _encode_payload(payload: Union[str, dict, bytes]) -> bytes:
+    if isinstance(payload, bytes):
+        return payload
+    if isinstance(payload, dict):
+        return _json_encode(payload)
+    return payload.encode()
+
+
 @implementer(IReactorPluggableNameResolver)
 class ExtendedMemoryReactorClock(MemoryReactorClock):
     def __init__(self):
         super().__init__()
-        self.work_notifier = Condition()
+        # set whenever there may be new work, while `wait_for_work` is waiting
+        self._work_available = Event()
+        self._waiting_for_work = False
 
         self.lookups: Dict[str, str] = {}
 
@@ -350,15 +437,33 @@ class ExtendedMemoryReactorClock(MemoryReactorClock):
         self.callLater(0, function, *args)
 
     def callLater(self, when, what, *a, **kw):
-        self.work_notifier.acquire()
-        try:
-            return_value = super().callLater(when, what, *a, **kw)
-            self.work_notifier.notify_all()
-        finally:
-            self.work_notifier.release()
-
+        return_value = super().callLater(when, what, *a, **kw)
+        self.notify_work()
         return return_value
 
+    def notify_work(self):
+        """
+        Wakes up `wait_for_work`, so that it checks again whether there is work
+        or whether it should stop early.
+        """
+        # Setting the event takes a lock, which we can skip unless something is
+        # actually waiting. When the tests run on a single thread (as they
+        # normally do), nothing ever is while we're here.
+        # This is safe as `wait_for_work` flags that it is waiting before it
+        # checks for work, and work is always added before calling this.
+        if self._waiting_for_work:
+            self._work_available.set()
+
+    def advance_to_next_call(self):
+        """
+        Advances the clock straight to the time of the earliest delayed call,
+        running it (and any others due by then).
+        Does nothing if there are no delayed calls.
+        """
+        calls = self.getDelayedCalls()
+        if calls:
+            self.advance(max(0, min(call.getTime() for call in calls) - self.seconds()))
+
     def wait_for_work(self, early_stop=lambda: False):
         """
         Blocks until there is work as long as the early stop condition
@@ -373,19 +478,21 @@ class ExtendedMemoryReactorClock(MemoryReactorClock):
                 waiting for is complete, e.g. a Deferred has fired or a
                 Request has been finished.
         """
-        self.work_notifier.acquire()
-
         try:
-            while len(self.getDelayedCalls()) == 0 and not early_stop():
-                self.work_notifier.wait()
+            while True:
+                self._work_available.clear()
+                self._waiting_for_work = True
+                if len(self.getDelayedCalls()) != 0 or early_stop():
+                    return
+                self._work_available.wait()
         finally:
-            self.work_notifier.release()
+            self._waiting_for_work = False
 
 
+@attr.s(slots=True, auto_attribs=True)
 class DummyResponse:
-    def __init__(self, code):
-        self.code = code
-        self.headers = Headers()
+    code: int
+    headers: Headers = attr.Factory(Headers)
 
 
 def make_async_magic_mock(ret_val):
@@ -395,7 +502,7 @@ def make_async_magic_mock(ret_val):
     return dummy
 
 
-@attr.s
+@attr.s(slots=True)
 class HTTPResult:
     """Holds the result data for FakeChannel"""
 
@@ -405,7 +512,7 @@ class HTTPResult:
     headers = attr.ib(type=Headers)
 
 
-@attr.s
+@attr.s(slots=True)
 class FakeChannel:
     """
     A fake Twisted Web Channel (the part that interfaces with the
@@ -417,8 +524,10 @@ class FakeChannel:
     _producer = None
 
     result = attr.ib(type=Optional[HTTPResult], default=None)
-    response_body = b""
+    response_body = attr.ib(type=bytearray, factory=bytearray)
     done = attr.ib(type=bool, default=False)
+    # called once the request is done
+    _on_done = attr.ib(type=Optional[Callable[[], None]], default=None)
 
     @property
     def code(self):
@@ -431,10 +540,15 @@ class FakeChannel:
 
     def write(self, content):
         assert isinstance(content, bytes), "Should be bytes! " + repr(content)
-        self.response_body += content
+        self.response_body.extend(content)
 
     def requestDone(self, _self):
+        # wake up anything waiting for work on the reactor, so that it notices
+        # straight away that the request is done
         self.done = True
+        if self._on_done is not None:
+            self._on_done()
+        self._reactor.notify_work()
 
     def getPeer(self):
         return None
@@ -446,10 +560,21 @@ class FakeChannel:
     def transport(self):
         return None
 
-    def process_request(self, method: bytes, request_path: bytes, content: BinaryIO):
-        """pretend that a request has arrived, and process it"""
+    def process_request(
+        self,
+        content: Union[bytes, BinaryIO],
+        method_path_version: Tuple[bytes, bytes, bytes] = _POST_REQ,
+    ):
+        """
+        pretend that a request has arrived, and process it
+
+        Args:
+            content: the body of the request
+            method_path_version: the method, path and HTTP version of the
+                request. Defaults to a POST to the notify endpoint.
+        """
 
         # this is normally done by HTTPChannel, in its various lineReceived etc methods
         req: Request = self.site.requestFactory(self)
-        req.content = content
-        req.requestReceived(method, request_path, b"1.1")
+        req.content = BytesIO(content) if isinstance(content, bytes) else content
+        req.requestReceived(*method_path_version)